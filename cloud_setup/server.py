@@ -1,7 +1,15 @@
 nano mqtt_worker.py
 
-import json
+import csv
+import io
+import logging
+import queue
+import threading
+import orjson
 import psycopg2
+import psycopg2.pool
+from psycopg2.extensions import connection as PGConnection
+from psycopg2.extras import execute_batch
 import paho.mqtt.client as mqtt
 from datetime import datetime
 
@@ -11,6 +19,17 @@ MQTT_PORT = 1883
 MQTT_TOPIC_SENSORS = "agrisense/sensors/data"
 MQTT_TOPIC_ALARM = "agrisense/alarms"
 
+QUEUE_MAX_SIZE = 10000    # Parsed payloads buffered between MQTT and the database
+DB_WORKERS = 4            # Threads writing batches to the database
+BATCH_MAX_MESSAGES = 200  # Sensor payloads written per database round-trip
+BATCH_WAIT = 0.1          # Seconds a worker waits for the first payload of a batch
+LOG_LEVEL = logging.INFO  # Set to logging.WARNING to silence per-batch logs
+COPY_THRESHOLD = 500      # Rows per batch from which COPY replaces the prepared INSERT
+
+# Sensor fields stored as metrics (everything else in the payload is metadata)
+METRIC_KEYS = ('temperature', 'humidity', 'soil', 'soil_raw', 'light', 'light_raw',
+               'air_quality', 'air_ppm', 'air_raw')
+
 DB_CONFIG = {
     "dbname": "agrisensedb", 
     "user": "admin",
@@ -19,79 +38,231 @@ DB_CONFIG = {
     "port": "5432"
 }
 
-# --- DATABASE FUNCTION ---
-def save_to_db(data):
+logging.basicConfig(
+    level=LOG_LEVEL,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Rows are staged in the UNLOGGED tagrisense_incoming table and moved into the
+# partitioned tagrisense table by a periodic job (see README)
+
+# Server-side prepared INSERT, parsed and planned once per connection
+PREPARE_INSERT = """
+    PREPARE agri_ins (text, text, timestamp, text, text, text, text, double precision) AS
+    INSERT INTO tagrisense_incoming (node_id, location, timestamp, edge_id, edge_name, edge_location, metric, value)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+"""
+EXECUTE_INSERT = "EXECUTE agri_ins (%s, %s, %s, %s, %s, %s, %s, %s)"
+
+COPY_INSERT = """
+    COPY tagrisense_incoming (node_id, location, timestamp, edge_id, edge_name, edge_location, metric, value)
+    FROM STDIN WITH CSV
+"""
+
+class PreparedConnection(PGConnection):
+    """Connection that remembers whether agri_ins has been prepared on it"""
+    prepared = False
+
+    def prepare_insert(self):
+        if not self.prepared:
+            with self.cursor() as cursor:
+                cursor.execute(PREPARE_INSERT)
+            self.commit()
+            self.prepared = True
+
+# Shared pool: connections are borrowed per message instead of reconnecting each time
+db_pool = psycopg2.pool.ThreadedConnectionPool(
+    minconn=2, maxconn=16, connection_factory=PreparedConnection, **DB_CONFIG
+)
+
+# Sensor payloads waiting to be written by the database workers
+message_queue = queue.Queue(maxsize=QUEUE_MAX_SIZE)
+queue_overflow = False  # set while the queue is full (warn once per overflow)
+
+# --- DATABASE FUNCTIONS ---
+def build_rows(data, default_timestamp):
+    # Only JSON objects are readings (scalars / nested arrays carry no metrics)
+    if not isinstance(data, dict):
+        return []
+    
+    # 1. Extract Datas
+    node_id = data.get("node_id", "unknown_device")
+    location = data.get("location", "unknown_location")
+    timestamp = data.get("received_at") or default_timestamp
+    edge_id = data.get("edge_id", "unknown_edge_id")
+    edge_name = data.get("edge_name", "unknown_edge_name")
+    edge_location = data.get("edge_location", "unknown_edge_location")
+    
+    # 2. One row per known metric present in the payload. Only real numbers are
+    #    stored: "N/A", nested objects and booleans would fail the whole batch
+    return [
+        (node_id, location, timestamp, edge_id, edge_name, edge_location, key, value)
+        for key in METRIC_KEYS
+        if isinstance(value := data.get(key), (int, float)) and not isinstance(value, bool)
+    ]
+
+def save_per_message(conn, cursor, message_rows):
+    # Fallback after a data error: each message gets its own savepoint, so a bad
+    # value only loses that message and the rest of the batch still commits
+    saved = 0
+    for rows in message_rows:
+        cursor.execute("SAVEPOINT agri_msg")
+        try:
+            execute_batch(cursor, EXECUTE_INSERT, rows, page_size=len(rows))
+            cursor.execute("RELEASE SAVEPOINT agri_msg")
+            saved += len(rows)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            raise
+        except psycopg2.Error as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT agri_msg")
+            logger.error(f"Skipped message from {rows[0][0]} with invalid data: {e}")
+    conn.commit()
+    return saved
+
+def save_to_db(batch):
     conn = None
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cursor = conn.cursor()
+        # One timestamp per batch for payloads without received_at
+        now = datetime.now().isoformat()
+        message_rows = [rows for rows in (build_rows(data, now) for data in batch) if rows]
+        rows = [row for msg in message_rows for row in msg]
+        if not rows:
+            return
         
-        # 1. Extract Datas
-        node_id = data.get("node_id", "unknown_device")
-        location = data.get("location", "unknown_location")
-        timestamp = data.get("received_at", datetime.now().isoformat())
-        edge_id = data.get("edge_id", "unknown_edge_id")
-        edge_name = data.get("edge_name", "unknown_edge_name")
-        edge_location = data.get("edge_location", "unknown_edge_location")
+        conn = db_pool.getconn()
+        conn.prepare_insert()
         
-        # 2. Extract metrics to ignore (metadata)
-        ignore_keys = ['node_id', 'location', 'received_at', 'edge_id', 'edge_name', 'edge_location']
+        # 3. The whole batch is one transaction: a single COMMIT (and WAL flush) for all rows
+        conn.autocommit = False
+        cursor = conn.cursor()
         
-        # 3. Loop through the remaining keys (temperature, humidity, etc.)   
-        for key, value in data.items():
-            if key not in ignore_keys and value is not None and value != "N/A":
-                query = """
-                    INSERT INTO tagrisense (node_id, location, timestamp, edge_id, edge_name, edge_location, metric, value)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                cursor.execute(query, (node_id, location, timestamp, edge_id, edge_name, edge_location, key, value))
+        # 4. Stream large batches with COPY, otherwise execute the prepared INSERT
+        #    for every metric of the batch in a single round-trip
+        try:
+            if len(rows) >= COPY_THRESHOLD:
+                csv_buffer = io.StringIO()
+                csv.writer(csv_buffer).writerows(rows)
+                csv_buffer.seek(0)
+                cursor.copy_expert(COPY_INSERT, csv_buffer)
+            else:
+                execute_batch(cursor, EXECUTE_INSERT, rows, page_size=len(rows))
+            conn.commit()
+            saved = len(rows)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            raise
+        except psycopg2.Error as e:
+            # One bad message aborted the whole batch: retry message by message
+            conn.rollback()
+            logger.warning(f"Batch rejected ({e}) - retrying per message")
+            saved = save_per_message(conn, cursor, message_rows)
         
-        conn.commit()
-        print(f"[{datetime.now()}] Saved data from {node_id}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Saved %d metrics from %d messages", saved, len(batch))
         cursor.close()
         
     except Exception as e:
-        print(f"Database Error: {e}")
+        logger.error(f"Database Error: {e}")
+        if conn is not None and not conn.closed:
+            conn.rollback()
     finally:
         if conn is not None:
-            conn.close()
+            # Broken connections are discarded so the pool reconnects
+            db_pool.putconn(conn, close=bool(conn.closed))
+
+# --- QUEUE FUNCTIONS ---
+def enqueue(data):
+    # Never block the MQTT network thread: drop the oldest payload when full
+    # (called only from the MQTT network thread, so the flag needs no lock)
+    global queue_overflow
+    try:
+        message_queue.put_nowait(data)
+        queue_overflow = False
+        return
+    except queue.Full:
+        pass
+    if not queue_overflow:
+        queue_overflow = True
+        logger.warning(f"Queue over {QUEUE_MAX_SIZE} messages - dropping oldest")
+    while True:
+        try:
+            message_queue.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            message_queue.put_nowait(data)
+            return
+        except queue.Full:
+            pass
+
+def drain_up_to(q, max_items, timeout):
+    # Wait up to `timeout` for the first item, then take whatever else has already arrived
+    try:
+        batch = [q.get(timeout=timeout)]
+    except queue.Empty:
+        return []
+    while len(batch) < max_items:
+        try:
+            batch.append(q.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+def db_worker():
+    while True:
+        try:
+            batch = drain_up_to(message_queue, BATCH_MAX_MESSAGES, timeout=BATCH_WAIT)
+            if batch:
+                save_to_db(batch)
+        except Exception as e:
+            # Keep the worker alive whatever a batch contains
+            logger.error(f"DB worker error: {e}")
 
 # --- MQTT HANDLERS ---
 def on_connect(client, userdata, flags, rc):
-    print(f"Connected to MQTT Broker (Code: {rc})")
+    logger.info(f"Connected to MQTT Broker (Code: {rc})")
     # Subscribe to both topics
     client.subscribe(MQTT_TOPIC_SENSORS)
     client.subscribe(MQTT_TOPIC_ALARM)
-    print(f"Subscribed to: {MQTT_TOPIC_SENSORS} and {MQTT_TOPIC_ALARM}")
+    logger.info(f"Subscribed to: {MQTT_TOPIC_SENSORS} and {MQTT_TOPIC_ALARM}")
 
 def on_message(client, userdata, msg):
     try:
-        payload = msg.payload.decode('utf-8')
-        
         # Route logic based on the topic
         if msg.topic == MQTT_TOPIC_ALARM:
-            print("\n" + "="*30)
-            print(f"ALARM RECEIVED: {payload}")
-            print("="*30 + "\n")
+            payload = msg.payload.decode('utf-8', 'replace')
+            logger.warning("=" * 30)
+            logger.warning(f"ALARM RECEIVED: {payload}")
+            logger.warning("=" * 30)
         
         elif msg.topic == MQTT_TOPIC_SENSORS:
-            data = json.loads(payload)
-            save_to_db(data)
+            # orjson validates UTF-8 while parsing the raw bytes
+            data = orjson.loads(msg.payload)
+            # BLE gateways publish readings in batches (JSON array)
+            for reading in (data if isinstance(data, list) else [data]):
+                if isinstance(reading, dict):
+                    enqueue(reading)
+                else:
+                    logger.warning(f"Skipping non-object reading: {reading!r}")
             
     except Exception as e:
-        print(f"Error processing message on {msg.topic}: {e}")
+        logger.error(f"Error processing message on {msg.topic}: {e}")
 
 # --- MAIN LOOP ---
 if __name__ == "__main__":
-    # Install paho-mqtt if missing: pip install paho-mqtt
+    # Install dependencies if missing: pip install paho-mqtt psycopg2-binary orjson
     client = mqtt.Client()
     client.on_connect = on_connect
     client.on_message = on_message
 
-    print("Starting MQTT Worker...")
+    for _ in range(DB_WORKERS):
+        threading.Thread(target=db_worker, daemon=True).start()
+
+    logger.info("Starting MQTT Worker...")
     try:
         client.connect(MQTT_HOST, MQTT_PORT, 60)
         client.loop_forever() # Runs forever blocking this script
     except KeyboardInterrupt:
-        print("Stopping...")
+        logger.info("Stopping...")
         client.disconnect()
+        db_pool.closeall()
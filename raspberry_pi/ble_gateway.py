@@ -7,18 +7,23 @@ receives sensor data, and publishes to local MQTT broker.
 
 Usage:
     python ble_gateway.py
+    python ble_gateway.py --verbose   # Log every reading and published batch
 
 Requirements:
-    pip install bleak paho-mqtt
+    pip install bleak gmqtt aiosqlite orjson
 """
 
+import argparse
 import asyncio
-import json
 import logging
+import time
+import orjson
+from collections import deque
 from datetime import datetime
 from bleak import BleakScanner, BleakClient
-import paho.mqtt.client as mqtt
-import sqlite3
+from gmqtt import Client as MQTTClient
+from gmqtt.mqtt.constants import MQTTv311, UNLIMITED_RECONNECTS
+import aiosqlite
 
 # ============== Configuration ==============
 
@@ -26,59 +31,111 @@ import sqlite3
 DEVICE_NAME_PREFIX = "AgriSense"
 SERVICE_UUID = "4fafc201-1fb5-459e-8fcc-c5c9c331914b"
 DATA_CHAR_UUID = "beb5483e-36e1-4688-b7f5-ea07361b26a8"
+MAX_CONCURRENT_CONNECTS = 5  # simultaneous connection attempts allowed on the BlueZ backend
+CONNECT_RETRY_MIN = 5   # seconds before retrying a device that failed to connect
+CONNECT_RETRY_MAX = 60  # back-off ceiling for repeatedly failing devices
 
 # MQTT Settings
 MQTT_BROKER = "localhost"
 MQTT_PORT = 1883
 MQTT_TOPIC = "agrisense/sensors/data"
+MQTT_RETRY_MAX = 30  # max seconds between initial connection attempts
 
 # Database Settings
 DB_FILE = "agrisense_data.db"
 
-# Scan Settings
-SCAN_INTERVAL = 5  # seconds between scans
+# Flush Settings
+FLUSH_INTERVAL = 0.2  # seconds between flushes of buffered readings to SQLite and MQTT
 
 # ============== Logging ==============
 
+# Libraries log at WARNING by default. The gateway logger stays at INFO so
+# lifecycle lines are shown; per-reading and per-flush detail is DEBUG only
+# (see --verbose)
 logging.basicConfig(
-    level=logging.INFO,
+    level=logging.WARNING,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
 
 # ============== MQTT Client ==============
 
-mqtt_client = mqtt.Client()
-mqtt_connected = False
-
-def on_mqtt_connect(client, userdata, flags, rc):
+# gmqtt runs on the asyncio event loop, reconnects on its own and keeps
+# unacknowledged QoS 1 messages for resending after a reconnect.
+# Its auto-reconnect only starts after a first successful connect (see connect_mqtt).
+# gmqtt's resend storage has no size cap, so nothing is published while the
+# broker is unreachable (the readings are already in SQLite)
+mqtt_client = MQTTClient("ble-gw")
+mqtt_started = False    # set once the first connect succeeds
+mqtt_connected = False  # tracks the live connection state
+mqtt_client.set_config({'reconnect_retries': UNLIMITED_RECONNECTS, 'reconnect_delay': 1})
+
+def on_mqtt_connect(client, flags, rc, properties):
     global mqtt_connected
-    if rc == 0:
-        mqtt_connected = True
-        logger.info("Connected to MQTT broker")
-    else:
-        logger.error(f"MQTT connection failed: {rc}")
+    mqtt_connected = True
+    logger.info("Connected to MQTT broker")
 
-def on_mqtt_disconnect(client, userdata, rc):
+def on_mqtt_disconnect(client, packet, exc=None):
     global mqtt_connected
     mqtt_connected = False
-    logger.warning("Disconnected from MQTT broker")
+    logger.warning("Disconnected from MQTT broker - storing readings in SQLite only until reconnect")
 
 mqtt_client.on_connect = on_mqtt_connect
 mqtt_client.on_disconnect = on_mqtt_disconnect
 
+async def connect_mqtt():
+    """Connect to the MQTT broker, retrying with back-off until the first connect succeeds"""
+    global mqtt_started
+    delay = 1
+    while True:
+        try:
+            await mqtt_client.connect(MQTT_BROKER, MQTT_PORT, keepalive=60, version=MQTTv311)
+            mqtt_started = True
+            return
+        except Exception as e:
+            logger.error(f"Failed to connect to MQTT: {e} - retrying in {delay}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MQTT_RETRY_MAX)
+
+def publish_readings(readings):
+    """Publish a batch of readings as a single JSON array"""
+    if not mqtt_connected:
+        # Broker unreachable: readings are still stored in SQLite
+        logger.debug("MQTT not connected - %d readings stored only", len(readings))
+        return
+
+    try:
+        mqtt_client.publish(MQTT_TOPIC, orjson.dumps(readings), qos=1)
+        logger.debug("Published batch of %d readings", len(readings))
+    except Exception as e:
+        logger.error(f"Failed to publish {len(readings)} readings: {e}")
+
 # ============== Database ==============
 
 db_connection = None
+db_cursor = None
+
+# Kept as a single module-level string so the sqlite3 statement cache reuses the compiled INSERT
+SQL_INSERT = '''
+    INSERT INTO sensor_readings (
+        timestamp, node_id, location, temperature, humidity,
+        soil, soil_raw, light, light_raw, air_quality, air_ppm, air_raw, received_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
 
-def init_database():
+async def init_database():
     """Initialize SQLite database and create table if not exists"""
-    global db_connection
+    global db_connection, db_cursor
     try:
-        db_connection = sqlite3.connect(DB_FILE, check_same_thread=False)
-        cursor = db_connection.cursor()
+        db_connection = await aiosqlite.connect(DB_FILE)
+        cursor = await db_connection.cursor()
+
+        await cursor.execute("PRAGMA journal_mode=WAL")
+        await cursor.execute("PRAGMA synchronous=NORMAL")
+        await cursor.execute("PRAGMA temp_store=MEMORY")
 
-        cursor.execute('''
+        await cursor.execute('''
             CREATE TABLE IF NOT EXISTS sensor_readings (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 timestamp TEXT NOT NULL,
@@ -97,56 +154,88 @@ def init_database():
             )
         ''')
 
-        db_connection.commit()
+        await db_connection.commit()
+
+        # Long-lived cursor reused by every insert
+        db_cursor = cursor
         logger.info(f"Database initialized: {DB_FILE}")
 
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
 
-def save_to_database(sensor_data):
-    """Save sensor data to SQLite database"""
-    if db_connection is None:
+def reading_row(sensor_data):
+    """Map a reading to the sensor_readings INSERT parameters"""
+    return (
+        # received_at is set once by notification_handler and reused as the row timestamp
+        sensor_data.get('received_at') or datetime.now().isoformat(),
+        sensor_data.get('node_id'),
+        sensor_data.get('location'),
+        sensor_data.get('temperature'),
+        sensor_data.get('humidity'),
+        sensor_data.get('soil'),
+        sensor_data.get('soil_raw'),
+        sensor_data.get('light'),
+        sensor_data.get('light_raw'),
+        sensor_data.get('air_quality'),
+        sensor_data.get('air_ppm'),
+        sensor_data.get('air_raw'),
+        sensor_data.get('received_at')
+    )
+
+async def save_to_database(readings):
+    """Save a batch of readings to SQLite database in one transaction"""
+    if db_cursor is None:
         logger.warning("Database not initialized - data not saved")
         return
 
     try:
-        cursor = db_connection.cursor()
-
-        cursor.execute('''
-            INSERT INTO sensor_readings (
-                timestamp, node_id, location, temperature, humidity,
-                soil, soil_raw, light, light_raw, air_quality, air_ppm, air_raw, received_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            datetime.now().isoformat(),
-            sensor_data.get('node_id'),
-            sensor_data.get('location'),
-            sensor_data.get('temperature'),
-            sensor_data.get('humidity'),
-            sensor_data.get('soil'),
-            sensor_data.get('soil_raw'),
-            sensor_data.get('light'),
-            sensor_data.get('light_raw'),
-            sensor_data.get('air_quality'),
-            sensor_data.get('air_ppm'),
-            sensor_data.get('air_raw'),
-            sensor_data.get('received_at')
-        ))
-
-        db_connection.commit()
+        await db_cursor.executemany(SQL_INSERT, [reading_row(r) for r in readings])
+        await db_connection.commit()
 
     except Exception as e:
         logger.error(f"Failed to save to database: {e}")
 
+# ============== Flush ==============
+
+_buffer = deque()  # readings parsed but not yet stored or published
+
+async def flush_buffer():
+    """Store and publish everything buffered since the last flush"""
+    if not _buffer:
+        return
+
+    batch = list(_buffer)
+    _buffer.clear()
+
+    try:
+        await save_to_database(batch)
+    except asyncio.CancelledError:
+        # Put the taken readings back so the final flush still stores them
+        _buffer.extendleft(reversed(batch))
+        raise
+    publish_readings(batch)
+
+async def flush_loop(stop_event):
+    """Periodically flush buffered readings to SQLite and MQTT until stop_event is set"""
+    while not stop_event.is_set():
+        try:
+            await asyncio.wait_for(stop_event.wait(), FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        await flush_buffer()
+
 # ============== BLE Gateway ==============
 
 connected_devices = {}
+connecting_tasks = {}     # address -> connection attempt in progress
+connect_backoff = {}      # address -> (monotonic time of next attempt, current delay)
+connect_semaphore = None  # created in main() so it binds to the running event loop
 
 async def notification_handler(sender, data):
     """Handle incoming BLE notifications"""
     try:
-        payload = data.decode('utf-8')
-        sensor_data = json.loads(payload)
+        # orjson parses the raw bytes directly (no separate UTF-8 decode)
+        sensor_data = orjson.loads(data)
         
         # Add timestamp
         sensor_data['received_at'] = datetime.now().isoformat()
@@ -157,22 +246,19 @@ async def notification_handler(sender, data):
                 sensor_data[key] = value
             del sensor_data['data']
 
-        # Save to SQLite database immediately
-        save_to_database(sensor_data)
-
-        # Publish to MQTT
-        if mqtt_connected:
-            mqtt_client.publish(MQTT_TOPIC, json.dumps(sensor_data))
-            logger.info(f"Published: {sensor_data.get('node_id', 'unknown')} - "
-                       f"Temp: {sensor_data.get('temperature', 'N/A')}°C, "
-                       f"Humidity: {sensor_data.get('humidity', 'N/A')}%, "
-                       f"Soil: {sensor_data.get('soil', 'N/A')}%, "
-                       f"Light: {sensor_data.get('light', 'N/A')}%, "
-                       f"Air: {sensor_data.get('air_quality', 'N/A')} ({sensor_data.get('air_ppm', 'N/A')} PPM)")
-        else:
-            logger.warning("MQTT not connected - data not published")
+        # Stored and published by the next flush
+        _buffer.append(sensor_data)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Received: %s - Temp: %s°C, Humidity: %s%%, Soil: %s%%, Light: %s%%, Air: %s (%s PPM)",
+                        sensor_data.get('node_id', 'unknown'),
+                        sensor_data.get('temperature', 'N/A'),
+                        sensor_data.get('humidity', 'N/A'),
+                        sensor_data.get('soil', 'N/A'),
+                        sensor_data.get('light', 'N/A'),
+                        sensor_data.get('air_quality', 'N/A'),
+                        sensor_data.get('air_ppm', 'N/A'))
             
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         logger.error(f"Invalid JSON: {e}")
     except Exception as e:
         logger.error(f"Error handling notification: {e}")
@@ -182,54 +268,68 @@ async def connect_device(device):
     if device.address in connected_devices:
         return
     
-    logger.info(f"Connecting to {device.name} ({device.address})...")
-    
-    try:
-        client = BleakClient(device.address)
-        await client.connect()
+    async with connect_semaphore:
+        logger.info(f"Connecting to {device.name} ({device.address})...")
         
-        if client.is_connected:
-            logger.info(f"Connected to {device.name}")
-            connected_devices[device.address] = client
+        try:
+            client = BleakClient(device, disconnected_callback=on_device_disconnect)
+            await client.connect()
             
-            # Subscribe to notifications
-            await client.start_notify(DATA_CHAR_UUID, notification_handler)
-            logger.info(f"Subscribed to notifications from {device.name}")
-            
-    except Exception as e:
-        logger.error(f"Failed to connect to {device.name}: {e}")
+            if client.is_connected:
+                logger.info(f"Connected to {device.name}")
+                connected_devices[device.address] = client
+                
+                # Subscribe to notifications
+                await client.start_notify(DATA_CHAR_UUID, notification_handler)
+                logger.info(f"Subscribed to notifications from {device.name}")
+                connect_backoff.pop(device.address, None)
+                return
+                
+        except Exception as e:
+            logger.error(f"Failed to connect to {device.name}: {e}")
+        
+        # Advertisements keep arriving, so wait (doubling) before the next attempt
+        _, delay = connect_backoff.get(device.address, (0, 0))
+        delay = min(max(delay * 2, CONNECT_RETRY_MIN), CONNECT_RETRY_MAX)
+        connect_backoff[device.address] = (time.monotonic() + delay, delay)
+
+def on_device_disconnect(client):
+    """Forget a dropped device so its next advertisement reconnects it"""
+    logger.warning(f"Device {client.address} disconnected")
+    connected_devices.pop(client.address, None)
+
+def on_advertisement(device, advertisement_data):
+    """Connect to new AgriSense devices as their advertisements arrive"""
+    name = device.name or advertisement_data.local_name
+    if not name or not name.startswith(DEVICE_NAME_PREFIX):
+        return
+    if device.address in connected_devices or device.address in connecting_tasks:
+        return
+    backoff = connect_backoff.get(device.address)
+    if backoff and time.monotonic() < backoff[0]:
+        return
 
-async def scan_and_connect():
-    """Scan for devices and connect"""
-    logger.info("Scanning for AgriSense devices...")
-    
-    devices = await BleakScanner.discover(timeout=5.0)
-    
-    for device in devices:
-        if device.name and device.name.startswith(DEVICE_NAME_PREFIX):
-            await connect_device(device)
+    task = asyncio.create_task(connect_device(device))
+    connecting_tasks[device.address] = task
+    task.add_done_callback(lambda _: connecting_tasks.pop(device.address, None))
 
 async def monitor_connections():
-    """Monitor and reconnect dropped connections"""
-    while True:
-        # Check connected devices
-        disconnected = []
-        for address, client in connected_devices.items():
-            if not client.is_connected:
-                disconnected.append(address)
-        
-        # Remove disconnected devices
-        for address in disconnected:
-            logger.warning(f"Device {address} disconnected")
-            del connected_devices[address]
-        
-        # Scan for new devices
-        await scan_and_connect()
-        
-        await asyncio.sleep(SCAN_INTERVAL)
+    """Scan continuously and react to advertisements"""
+    scanner = BleakScanner(detection_callback=on_advertisement)
+
+    logger.info("Scanning for AgriSense devices...")
+    await scanner.start()
+    try:
+        # Runs until cancelled
+        await asyncio.Event().wait()
+    finally:
+        await scanner.stop()
 
 async def main():
     """Main entry point"""
+    global connect_semaphore
+    connect_semaphore = asyncio.Semaphore(MAX_CONCURRENT_CONNECTS)
+
     logger.info("=" * 50)
     logger.info("  AgriSense BLE Gateway")
     logger.info("=" * 50)
@@ -239,36 +339,47 @@ async def main():
     logger.info("=" * 50)
 
     # Initialize database
-    init_database()
+    await init_database()
 
-    # Connect to MQTT
-    try:
-        mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
-        mqtt_client.loop_start()
-    except Exception as e:
-        logger.error(f"Failed to connect to MQTT: {e}")
-        return
+    # Connect to MQTT in the background: BLE monitoring and SQLite buffering
+    # run even while the broker is down
+    mqtt_task = asyncio.create_task(connect_mqtt())
     
+    # Store and publish readings in the background
+    flush_stop = asyncio.Event()
+    flush_task = asyncio.create_task(flush_loop(flush_stop))
+
     # Run BLE monitoring
     try:
         await monitor_connections()
     except KeyboardInterrupt:
         logger.info("Shutting down...")
     finally:
-        # Disconnect all devices
-        for address, client in connected_devices.items():
+        # Disconnect all devices (copied: disconnect callbacks modify the dict)
+        for client in list(connected_devices.values()):
             try:
                 await client.disconnect()
             except:
                 pass
 
-        # Close database connection
+        # Let an in-flight flush finish, then flush what is left and close the database
+        flush_stop.set()
+        await flush_task
+        await flush_buffer()
         if db_connection:
-            db_connection.close()
+            await db_connection.close()
             logger.info("Database connection closed")
 
-        mqtt_client.loop_stop()
-        mqtt_client.disconnect()
+        mqtt_task.cancel()
+        if mqtt_started:
+            await mqtt_client.disconnect()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='AgriSense BLE Gateway')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help='Enable debug logging (per-reading detail)')
+    if parser.parse_args().verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+        logger.setLevel(logging.DEBUG)
+
     asyncio.run(main())
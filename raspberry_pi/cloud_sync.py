@@ -24,19 +24,79 @@ Usage:
 
 Requirements:
     pip install paho-mqtt
+    pip install orjson  # optional, faster JSON encoding/decoding
 """
 
 import paho.mqtt.client as mqtt
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
 import json
 import logging
+import math
 import time
 import sqlite3
+import select
+import socket
+import struct
 import os
 from datetime import datetime
-from threading import Thread, Lock
-from queue import Queue
+from threading import Event, Thread, Lock
+from queue import Empty, Full, Queue
 import argparse
 
+# Fixed shape of a forwarded sensor reading (ESP32 fields + gateway/edge metadata)
+_SENSOR_STR_KEYS = ('node_id', 'location', 'received_at', 'edge_id', 'edge_name', 'edge_location')
+_SENSOR_NUM_KEYS = ('temperature', 'humidity', 'light', 'light_raw', 'soil', 'soil_raw',
+                    'air_quality', 'air_ppm', 'air_raw')
+_SENSOR_KEYS = frozenset(_SENSOR_STR_KEYS + _SENSOR_NUM_KEYS)
+_SENSOR_TEMPLATE = (
+    '{"node_id":"%s","location":"%s","received_at":"%s",'
+    '"edge_id":"%s","edge_name":"%s","edge_location":"%s",'
+    '"temperature":%r,"humidity":%r,"light":%r,"light_raw":%r,"soil":%r,"soil_raw":%r,'
+    '"air_quality":%r,"air_ppm":%r,"air_raw":%r}'
+)
+
+
+def _fast_serialize(payload):
+    """
+    Serialise a full sensor reading with a fixed template instead of walking the dict.
+
+    Returns None when the payload does not have exactly the expected keys, or a
+    value would need JSON escaping, so the caller can use the generic encoder.
+    """
+    if not isinstance(payload, dict) or payload.keys() != _SENSOR_KEYS:
+        return None
+    
+    values = []
+    for key in _SENSOR_STR_KEYS:
+        value = payload[key]
+        if (type(value) is not str or not value.isascii() or not value.isprintable()
+                or '"' in value or '\\' in value):
+            return None
+        values.append(value)
+    for key in _SENSOR_NUM_KEYS:
+        value = payload[key]
+        if type(value) is int or (type(value) is float and math.isfinite(value)):
+            values.append(value)
+        else:
+            return None
+    
+    return (_SENSOR_TEMPLATE % tuple(values)).encode('ascii')
+
+
+# orjson is much faster than the stdlib on small payloads; fall back to json if missing.
+# Both dumps variants return bytes, which paho publishes as-is.
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads  # accepts bytes, no separate UTF-8 decode
+except ImportError:
+    def _dumps(obj) -> bytes:
+        # Sensor readings take the template fast path; anything else goes to json
+        data = _fast_serialize(obj)
+        return data if data is not None else json.dumps(obj).encode()
+    _loads = json.loads
+
 # ============== Configuration ==============
 
 class Config:
@@ -52,11 +112,20 @@ class Config:
     CLOUD_ALARMS_TOPIC = "agrisense/alarms"
     
     # Sync settings
-    REALTIME_MODE = True      # Send data immediately (True) or use batching (False)
-    BATCH_SIZE = 1            # Number of readings to batch before sending (1 for real-time)
-    BATCH_TIMEOUT = 2         # Send batch after this many seconds even if not full
+    BATCH_SIZE = 50           # Send as soon as this many readings are buffered
+    BATCH_TIMEOUT = 0.05      # Send buffered readings after this many seconds even if not full
     RETRY_INTERVAL = 5        # Seconds between reconnection attempts
+    RETRY_MAX_INTERVAL = 60   # Reconnect back-off ceiling (seconds)
+    STATS_INTERVAL = 60       # Seconds between data flow stats reports
     OFFLINE_DB = "offline_queue.db"
+    MAX_OFFLINE_ROWS = 50000      # Oldest queued readings are evicted beyond this many
+    MAX_BATCH_BUFFER = 10000      # Oldest buffered readings are dropped beyond this many
+    OFFLINE_WRITE_BATCH = 256     # Max offline readings written per transaction
+    MAX_DB_QUEUE = 10000          # Oldest readings waiting for the SQLite writer are dropped beyond this many
+    OFFLINE_DRAIN_LIMIT = 500     # Queued readings fetched per drain cycle
+    OFFLINE_MARK_BATCH = 25       # Queued readings fetched / deleted per chunk while draining
+    SESSION_EXPIRY = 3600         # Seconds the cloud broker keeps our MQTT v5 session
+    CLOUD_SOCKET_BUFFER = 1 << 20 # SO_SNDBUF / SO_RCVBUF for the WAN link (bytes)
 
     # Edge identity
     EDGE_ID = "edge-rpi-001"
@@ -66,11 +135,15 @@ class Config:
 
 # ============== Logging Setup ==============
 
+# Libraries log at WARNING by default. The service logger stays at INFO so
+# lifecycle and periodic stats lines are shown; per-reading detail is DEBUG
+# only (see --verbose)
 logging.basicConfig(
-    level=logging.INFO,
+    level=logging.WARNING,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
 
 
 # ============== Offline Queue (SQLite) ==============
@@ -81,68 +154,121 @@ class OfflineQueue:
     Ensures no data loss during network outages.
     """
     
-    def __init__(self, db_path: str = Config.OFFLINE_DB):
+    # WAL journal: writes append to the WAL file instead of rewriting a rollback journal
+    _PRAGMAS = (
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        'PRAGMA temp_store=MEMORY',
+        'PRAGMA cache_size=-8000',
+        'PRAGMA busy_timeout=2000',
+    )
+    
+    _SQL_INSERT = 'INSERT INTO reading_queue (data) VALUES (?)'
+    # Keyset pagination on the primary key: no sort over the whole table
+    _SQL_SELECT_PENDING = '''
+        SELECT id, data FROM reading_queue
+        WHERE status = 'pending' AND id > ?
+        ORDER BY id
+        LIMIT ?
+    '''
+    _SQL_DELETE_IN = 'DELETE FROM reading_queue WHERE id IN ({})'
+    _SQL_EVICT_OLDEST = '''
+        DELETE FROM reading_queue WHERE id IN (
+            SELECT id FROM reading_queue ORDER BY id LIMIT ?
+        )
+    '''
+    
+    def __init__(self, db_path: str = Config.OFFLINE_DB, max_rows: int = Config.MAX_OFFLINE_ROWS):
         self.db_path = db_path
-        self._init_db()
+        self.max_rows = max_rows
+        self._evicting = False  # Warn once per overflow, not per evicted row
         self._lock = Lock()
+        # One long-lived connection shared by all threads (serialised by self._lock).
+        # isolation_level=None: statements autocommit unless wrapped in BEGIN/COMMIT
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._init_db()
     
     def _init_db(self):
         """Initialise SQLite database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS reading_queue (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                data TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'pending'
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-        logger.info(f"Offline queue initialised: {self.db_path}")
-    
-    def enqueue(self, data: dict) -> int:
-        """Add reading to offline queue"""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            for pragma in self._PRAGMAS:
+                self._conn.execute(pragma)
             
-            cursor.execute(
-                'INSERT INTO reading_queue (data) VALUES (?)',
-                (json.dumps(data),)
-            )
-            
-            queue_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS reading_queue (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    data BLOB NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    status TEXT DEFAULT 'pending'
+                )
+            ''')
             
-            return queue_id
+            # Pending count is tracked in memory from here on (see get_count)
+            self._count = self._conn.execute(
+                'SELECT COUNT(*) FROM reading_queue WHERE status = "pending"'
+            ).fetchone()[0]
+        
+        logger.info(f"Offline queue initialised: {self.db_path} ({self._count} pending)")
     
-    def get_pending(self, limit: int = 100) -> list:
-        """Get pending readings"""
+    def enqueue(self, data: dict):
+        """Add reading to offline queue (subject to the same max_rows eviction)"""
+        self.enqueue_many([data])
+    
+    def enqueue_many(self, items: list):
+        """
+        Add several readings to offline queue in one transaction.
+
+        Once the queue holds more than max_rows, the oldest readings are evicted
+        in the same transaction so a long outage cannot fill the SD card.
+        """
+        if not items:
+            return
+        
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            evicted = 0
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.executemany(
+                    self._SQL_INSERT,
+                    [(_dumps(item),) for item in items]
+                )
+                excess = self._count + len(items) - self.max_rows
+                if excess > 0:
+                    evicted = self._conn.execute(self._SQL_EVICT_OLDEST, (excess,)).rowcount
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._count += len(items) - evicted
             
-            cursor.execute('''
-                SELECT id, data FROM reading_queue 
-                WHERE status = 'pending'
-                ORDER BY created_at ASC
-                LIMIT ?
-            ''', (limit,))
+            if evicted and not self._evicting:
+                self._evicting = True
+                logger.warning(f"Offline queue full ({self.max_rows} readings) - "
+                               f"evicting oldest readings")
+    
+    def get_pending(self, limit: int = 100, chunk_size: int = 25):
+        """
+        Yield pending readings oldest first, up to limit.
+
+        Rows are fetched chunk_size at a time and decoded lazily, so peak memory
+        stays bounded during a large catch-up. The lock is not held between
+        chunks, so the caller may mark_sent() while iterating.
+        """
+        last_id = 0
+        while limit > 0:
+            with self._lock:
+                rows = self._conn.execute(
+                    self._SQL_SELECT_PENDING, (last_id, min(chunk_size, limit))
+                ).fetchall()
+            
+            if not rows:
+                return
             
-            results = []
-            for row in cursor.fetchall():
-                results.append({
-                    'id': row[0],
-                    'data': json.loads(row[1])
-                })
+            for row_id, data in rows:
+                yield {'id': row_id, 'data': _loads(data)}
             
-            conn.close()
-            return results
+            last_id = rows[-1][0]
+            limit -= len(rows)
     
     def mark_sent(self, ids: list):
         """Mark readings as sent"""
@@ -150,28 +276,20 @@ class OfflineQueue:
             return
             
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             placeholders = ','.join('?' * len(ids))
-            cursor.execute(f'''
-                DELETE FROM reading_queue WHERE id IN ({placeholders})
-            ''', ids)
-            
-            conn.commit()
-            conn.close()
+            cursor = self._conn.execute(self._SQL_DELETE_IN.format(placeholders), ids)
+            self._count -= cursor.rowcount
+            if self._count < self.max_rows:
+                self._evicting = False
     
     def get_count(self) -> int:
-        """Get number of pending readings"""
+        """Get number of pending readings (in-memory counter, no table scan)"""
+        return self._count
+    
+    def close(self):
+        """Close the queue database connection"""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT COUNT(*) FROM reading_queue WHERE status = "pending"')
-            count = cursor.fetchone()[0]
-            
-            conn.close()
-            return count
+            self._conn.close()
 
 
 # ============== Cloud Sync Service ==============
@@ -181,6 +299,9 @@ class CloudSyncService:
     Handles bidirectional MQTT sync between edge and cloud.
     """
     
+    # Keys added by _tag_raw; payloads that already carry one take the dict path
+    _TAG_KEYS = frozenset(('edge_id', 'edge_name', 'edge_location', 'received_at'))
+    
     def __init__(self, config: Config = Config):
         self.config = config
         self.offline_queue = OfflineQueue()
@@ -193,24 +314,72 @@ class CloudSyncService:
         self.cloud_connected = False
         self.local_connected = False
         self.running = False
+        self._stop_event = Event()
         
-        # Batch buffer
-        self.batch_buffer = []
-        self.batch_lock = Lock()
+        # Batch buffer: single producer (MQTT callback) / single consumer (batch sender).
+        # Double-buffered: the sender swaps in the other list and drains the old one.
+        # list.append and slice deletion are atomic under the GIL, so no lock is needed
+        self._buf_a = []
+        self._buf_b = []
+        self.batch_buffer = self._buf_a
         self.last_batch_time = time.time()
+        self._batch_overflow = False
+        # Wakes the housekeeping thread when a reading lands in an empty buffer or
+        # the batch fills, so it can sleep until the next job is due when idle
+        self._batch_event = Event()
+        
+        # Readings waiting for the SQLite writer thread (None stops the writer)
+        self._db_queue = Queue(maxsize=self.config.MAX_DB_QUEUE)
+        self._db_writer = None
+        self._db_overflow = False
+        
+        # Both MQTT clients are driven by one select() thread; publishers wake it
+        # through this socket pair when they queue outgoing packets
+        self._net_thread = None
+        self._reconnecting = set()  # clients owned by a _reconnect thread
+        self._retry_delay = {}      # client -> back-off, cleared on CONNACK
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        
+        # Edge identity never changes, so serialise it once and splice it
+        # onto raw reading bytes instead of re-dumping every payload
+        self._edge_suffix = (
+            b',"edge_id":' + _dumps(config.EDGE_ID) +
+            b',"edge_name":' + _dumps(config.EDGE_NAME) +
+            b',"edge_location":' + _dumps(config.EDGE_LOCATION)
+        )
+        
+        # Cached second-resolution timestamp (see _now_iso)
+        self._ts_sec = 0
+        self._ts_str = ''
         
         # Statistics
         self.stats = {
             'readings_received': 0,
             'readings_sent': 0,
             'readings_queued': 0,
+            'readings_dropped': 0,
             'connection_errors': 0,
             'last_sync': None
         }
     
+    def _now_iso(self) -> str:
+        """Current local time as ISO string, formatted at most once per second"""
+        s = int(time.time())
+        if s != self._ts_sec:
+            self._ts_sec = s
+            self._ts_str = datetime.fromtimestamp(s).isoformat()
+        return self._ts_str
+    
     def start(self):
         """Start the sync service"""
         self.running = True
+        self._stop_event.clear()
+
+        # All offline queue writes happen on this thread, off the MQTT callbacks
+        self._db_writer = Thread(target=self._db_writer_loop, daemon=True)
+        self._db_writer.start()
 
         # Setup local MQTT client
         self._setup_local_client()
@@ -218,57 +387,165 @@ class CloudSyncService:
         # Setup cloud MQTT client
         self._setup_cloud_client()
 
-        # Start batch sender thread
-        batch_thread = Thread(target=self._batch_sender_loop, daemon=True)
-        batch_thread.start()
-
-        # Start offline queue processor thread
-        queue_thread = Thread(target=self._offline_queue_processor, daemon=True)
-        queue_thread.start()
-
-        # Start statistics reporter thread
-        stats_thread = Thread(target=self._stats_reporter_loop, daemon=True)
-        stats_thread.start()
-
         logger.info("Cloud sync service started")
         logger.info(f"  Local broker: {self.config.LOCAL_BROKER}:{self.config.LOCAL_PORT}")
         logger.info(f"  Cloud broker: {self.config.CLOUD_BROKER}:{self.config.CLOUD_PORT}")
         
-        # Connect clients
+        # Queued packets are written by the network thread only
+        for client in (self.local_client, self.cloud_client):
+            client.on_socket_register_write = self._wake_net_loop
+        
+        # Connect clients (failed connections are retried by the network thread)
         try:
             self.local_client.connect(self.config.LOCAL_BROKER, self.config.LOCAL_PORT, 60)
-            self.local_client.loop_start()
         except Exception as e:
             logger.error(f"Failed to connect to local broker: {e}")
         
         try:
-            self.cloud_client.connect(self.config.CLOUD_BROKER, self.config.CLOUD_PORT, 60)
-            self.cloud_client.loop_start()
+            self.cloud_client.connect(self.config.CLOUD_BROKER, self.config.CLOUD_PORT, 60,
+                                      clean_start=False,
+                                      properties=self.cloud_connect_properties)
         except Exception as e:
             logger.error(f"Failed to connect to cloud broker: {e}")
             self.stats['connection_errors'] += 1
         
-        # Keep running
+        self._net_thread = Thread(target=self._net_loop, daemon=True)
+        self._net_thread.start()
+        
+        # Batching, offline drain and stats all run on the main thread
         try:
-            while self.running:
-                time.sleep(1)
+            self._housekeeping_loop()
         except KeyboardInterrupt:
             self.stop()
     
     def stop(self):
         """Stop the sync service"""
         self.running = False
+        self._stop_event.set()
+        self._batch_event.set()
         
-        if self.local_client:
-            self.local_client.loop_stop()
-            self.local_client.disconnect()
+        if self._net_thread:
+            self._wake_net_loop()
+            self._net_thread.join(timeout=5)
         
-        if self.cloud_client:
-            self.cloud_client.loop_stop()
-            self.cloud_client.disconnect()
+        # The network thread has exited, so write the DISCONNECT packets here
+        for client in (self.local_client, self.cloud_client):
+            if client:
+                client.disconnect()
+                client.loop_write()
         
+        if self._db_writer:
+            self._db_queue.put(None)
+            self._db_writer.join(timeout=5)
+        self.offline_queue.close()
         logger.info("Cloud sync service stopped")
     
+    def _wake_net_loop(self, *args):
+        """Interrupt the network thread's select() (paho socket_register_write hook)"""
+        try:
+            self._wake_w.send(b'\0')
+        except BlockingIOError:
+            pass  # Wake-up already pending
+    
+    def _net_loop(self):
+        """
+        Run network I/O for both MQTT clients on a single select() loop.
+
+        Replaces one paho loop_start() thread per client. A dropped client is
+        handed to a _reconnect thread, so a blocking connect to an unreachable
+        cloud broker never stalls local traffic.
+        """
+        clients = (self.local_client, self.cloud_client)
+        
+        while self.running:
+            try:
+                self._net_iteration(clients)
+            except Exception as e:
+                logger.error(f"Network loop error: {e}")
+                self._stop_event.wait(1)
+    
+    def _net_iteration(self, clients):
+        """One select() pass over the clients not currently reconnecting"""
+        active = []
+        rlist = [self._wake_r]
+        wlist = []
+        for client in clients:
+            if client in self._reconnecting:
+                continue
+            sock = client.socket()
+            if sock is None:
+                self._reconnecting.add(client)
+                Thread(target=self._reconnect, args=(client,), daemon=True).start()
+                continue
+            active.append(client)
+            rlist.append(sock)
+            if client.want_write():
+                wlist.append(sock)
+        
+        try:
+            readable, writable, _ = select.select(rlist, wlist, [], 1.0)
+        except (OSError, ValueError):
+            # A socket was closed under us; rebuild the lists
+            return
+        
+        if self._wake_r in readable:
+            try:
+                self._wake_r.recv(4096)
+            except BlockingIOError:
+                pass
+        
+        for client in active:
+            sock = client.socket()
+            if sock is None:
+                continue
+            if sock in readable:
+                client.loop_read()
+            if sock in writable or client.want_write():
+                client.loop_write()
+            client.loop_misc()
+    
+    def _reconnect(self, client):
+        """
+        Reconnect a client off the network thread, with a doubling back-off.
+
+        The back-off only resets on a successful CONNACK, so a broker that
+        accepts TCP and then drops the session is not retried in a tight loop.
+        """
+        try:
+            while self.running:
+                delay = self._retry_delay.get(client, self.config.RETRY_INTERVAL)
+                if self._stop_event.wait(delay):
+                    break
+                self._retry_delay[client] = min(delay * 2, self.config.RETRY_MAX_INTERVAL)
+                try:
+                    client.reconnect()
+                    break
+                except Exception as e:
+                    logger.debug(f"Reconnect failed: {e}")
+        finally:
+            # Hand the client back to the network thread
+            self._reconnecting.discard(client)
+            self._wake_net_loop()
+    
+    def _tune_socket(self, client, buffer_size: int = 0):
+        """
+        Disable Nagle on a connected client's socket and optionally enlarge its buffers.
+
+        MQTT packets here are small, so Nagle would hold them back waiting for
+        ACKs; larger buffers keep a high-latency WAN link busy.
+        """
+        sock = client.socket()
+        if sock is None:
+            return
+        
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if buffer_size:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, buffer_size)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, buffer_size)
+        except OSError as e:
+            logger.warning(f"Could not tune MQTT socket: {e}")
+    
     def _setup_local_client(self):
         """Setup local MQTT client"""
         self.local_client = mqtt.Client(client_id="cloud_sync_local")
@@ -276,6 +553,8 @@ class CloudSyncService:
         def on_connect(client, userdata, flags, rc):
             if rc == 0:
                 self.local_connected = True
+                self._retry_delay.pop(client, None)
+                self._tune_socket(client)
                 logger.info("Connected to local MQTT broker")
                 # Subscribe to ALL sensor data from ESP32 (via BLE gateway)
                 client.subscribe(self.config.LOCAL_TOPIC)
@@ -299,11 +578,23 @@ class CloudSyncService:
     
     def _setup_cloud_client(self):
         """Setup cloud MQTT client"""
-        self.cloud_client = mqtt.Client(client_id=f"edge_{self.config.EDGE_ID}")
+        # MQTT v5 persistent session so in-flight QoS 1 alarms survive reconnects
+        self.cloud_client = mqtt.Client(client_id=f"edge_{self.config.EDGE_ID}",
+                                        protocol=mqtt.MQTTv5)
+        self.cloud_connect_properties = Properties(PacketTypes.CONNECT)
+        self.cloud_connect_properties.SessionExpiryInterval = self.config.SESSION_EXPIRY
         
-        def on_connect(client, userdata, flags, rc):
+        # QoS 0 PUBLISH to CLOUD_TOPIC: everything after the fixed header is constant
+        # except the payload (topic length, topic, empty v5 property block)
+        topic = self.config.CLOUD_TOPIC.encode()
+        self._publish_tail = struct.pack('!H', len(topic)) + topic + b'\x00'
+        self._publish_info = mqtt.MQTTMessageInfo(0)
+        
+        def on_connect(client, userdata, flags, rc, properties=None):
             if rc == 0:
                 self.cloud_connected = True
+                self._retry_delay.pop(client, None)
+                self._tune_socket(client, self.config.CLOUD_SOCKET_BUFFER)
                 logger.info("Connected to cloud MQTT broker")
                 # Subscribe to commands from cloud (optional)
                 client.subscribe(f"agrisense/commands/{self.config.EDGE_ID}")
@@ -311,7 +602,7 @@ class CloudSyncService:
                 logger.error(f"Cloud MQTT connection failed: {rc}")
                 self.stats['connection_errors'] += 1
         
-        def on_disconnect(client, userdata, rc):
+        def on_disconnect(client, userdata, rc, properties=None):
             self.cloud_connected = False
             logger.warning("Disconnected from cloud MQTT broker")
         
@@ -325,69 +616,116 @@ class CloudSyncService:
     def _handle_local_message(self, msg):
         """Handle message from local MQTT broker"""
         try:
-            # Receive COMPLETE sensor payload from ESP32 (via BLE gateway)
-            # Contains: node_id, location, temperature, humidity,
-            #           light, light_raw, soil, soil_raw, air_quality, air_ppm, air_raw
-            payload = json.loads(msg.payload.decode())
-            self.stats['readings_received'] += 1
-
-            # Add edge metadata (preserves ALL original sensor fields)
-            payload['edge_id'] = self.config.EDGE_ID
-            payload['edge_name'] = self.config.EDGE_NAME
-            payload['edge_location'] = self.config.EDGE_LOCATION
-            payload['received_at'] = datetime.now().isoformat()
-
-            if msg.topic == "agrisense/alarms":
-                # Forward alarms immediately (always real-time)
-                success = self._send_to_cloud(self.config.CLOUD_ALARMS_TOPIC, payload)
-                if success:
-                    logger.warning(f"ALARM sent to cloud: {payload.get('violations', 'unknown')}")
-                else:
-                    logger.error(f"ALARM queued (cloud offline): {payload.get('violations', 'unknown')}")
-            else:
-                # In real-time mode, send immediately; otherwise batch
-                if self.config.REALTIME_MODE:
-                    # Send ALL sensor data immediately to cloud (no filtering)
-                    success = self._send_to_cloud(self.config.CLOUD_TOPIC, payload)
-                    if success:
-                        logger.info(f"Sent ALL sensor data to cloud from {payload.get('node_id', 'unknown')}:")
-                        logger.info(f"    Temp: {payload.get('temperature', 'N/A')}°C, "
-                                   f"Humidity: {payload.get('humidity', 'N/A')}%")
-                        logger.info(f"    Light: {payload.get('light', 'N/A')}% (raw: {payload.get('light_raw', 'N/A')}), "
-                                   f"Soil: {payload.get('soil', 'N/A')}% (raw: {payload.get('soil_raw', 'N/A')})")
-                        logger.info(f"    Air Quality: {payload.get('air_quality', 'N/A')} (raw: {payload.get('air_raw', 'N/A')})")
-                    else:
-                        logger.warning(f"Queued (cloud offline): {payload.get('node_id', 'unknown')} - "
-                                      f"Queue size: {self.offline_queue.get_count()}")
-                else:
-                    # Add sensor data to batch
-                    with self.batch_lock:
-                        self.batch_buffer.append(payload)
+            # Parsing validates the JSON (invalid payloads raise and are dropped here)
+            data = _loads(msg.payload)
+
+            # Single untagged JSON object: splice edge metadata onto the raw bytes
+            # instead of re-serialising. The BLE gateway publishes arrays (and sets
+            # received_at), so its readings take the per-element path below
+            if isinstance(data, dict) and data and self._TAG_KEYS.isdisjoint(data):
+                raw = msg.payload.strip()
+                if msg.topic == "agrisense/alarms":
+                    self._forward_alarm(raw)
+                    return
+                if msg.topic == self.config.LOCAL_TOPIC:
+                    self._forward_raw(raw)
+                    return
 
-                    logger.debug(f"Buffered reading from {payload.get('node_id', 'unknown')}")
+            # The BLE gateway publishes readings in batches (JSON array)
+            for payload in (data if isinstance(data, list) else [data]):
+                if isinstance(payload, dict):
+                    self._handle_reading(msg.topic, payload)
+                else:
+                    logger.warning(f"Skipping non-object reading: {payload!r}")
 
         except json.JSONDecodeError as e:
             logger.error(f"Invalid JSON from local broker: {e}")
         except Exception as e:
             logger.error(f"Error handling local message: {e}")
+
+    def _tag_raw(self, raw: bytes) -> bytes:
+        """
+        Splice edge metadata and received_at into a serialised JSON object.
+
+        raw must be a validated, non-empty JSON object without any _TAG_KEYS,
+        otherwise the result would be invalid or carry duplicate keys.
+        """
+        received_at = self._now_iso().encode()
+        return raw[:-1] + self._edge_suffix + b',"received_at":"' + received_at + b'"}'
+
+    def _forward_raw(self, raw: bytes):
+        """Tag a serialised reading with edge metadata and forward it as-is"""
+        self.stats['readings_received'] += 1
+
+        payload = self._tag_raw(raw)
+        self._buffer_reading(payload)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Buffered reading from {_loads(payload).get('node_id', 'unknown')}")
+
+    def _buffer_reading(self, payload):
+        """Append a reading to the batch buffer, waking the sender when it needs to act"""
+        buf = self.batch_buffer
+        buf.append(payload)
+        count = len(buf)
+        if count == 1 or count == self.config.BATCH_SIZE:
+            self._batch_event.set()
+
+    def _forward_alarm(self, raw: bytes):
+        """Tag a serialised Node-RED alarm and forward it immediately"""
+        self.stats['readings_received'] += 1
+
+        success = self._send_to_cloud(self.config.CLOUD_ALARMS_TOPIC, self._tag_raw(raw), qos=1)
+        alarm = raw.decode('utf-8', 'replace')
+        if success:
+            logger.warning(f"ALARM sent to cloud: {alarm}")
+        else:
+            logger.error(f"ALARM queued (cloud offline): {alarm}")
+
+    def _handle_reading(self, topic: str, payload: dict):
+        """Tag a single reading with edge metadata and forward it"""
+        # Receive COMPLETE sensor payload from ESP32 (via BLE gateway)
+        # Contains: node_id, location, temperature, humidity,
+        #           light, light_raw, soil, soil_raw, air_quality, air_ppm, air_raw
+        self.stats['readings_received'] += 1
+
+        # Add edge metadata (preserves ALL original sensor fields)
+        payload['edge_id'] = self.config.EDGE_ID
+        payload['edge_name'] = self.config.EDGE_NAME
+        payload['edge_location'] = self.config.EDGE_LOCATION
+        payload['received_at'] = self._now_iso()
+
+        if topic == "agrisense/alarms":
+            # Forward alarms immediately (always real-time)
+            success = self._send_to_cloud(self.config.CLOUD_ALARMS_TOPIC, payload, qos=1)
+            if success:
+                logger.warning(f"ALARM sent to cloud: {payload.get('violations', 'unknown')}")
+            else:
+                logger.error(f"ALARM queued (cloud offline): {payload.get('violations', 'unknown')}")
+        else:
+            # Sensor data is micro-batched; the batch sender sends it within BATCH_TIMEOUT
+            self._buffer_reading(payload)
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Buffered reading from {payload.get('node_id', 'unknown')}")
     
     def _handle_cloud_message(self, msg):
         """Handle message from cloud MQTT broker (commands)"""
         try:
-            payload = json.loads(msg.payload.decode())
+            payload = _loads(msg.payload)
             logger.info(f"Received command from cloud: {payload}")
             
             # Forward command to local MQTT for Node-RED/actuators
             if self.local_connected:
                 self.local_client.publish(
                     "agrisense/commands",
-                    json.dumps(payload)
+                    _dumps(payload)
                 )
                 
         except Exception as e:
             logger.error(f"Error handling cloud message: {e}")
     
-    def _send_to_cloud(self, topic: str, payload: dict) -> bool:
+    def _send_to_cloud(self, topic: str, payload, qos: int = 0) -> bool:
         """
         Send COMPLETE sensor data to cloud MQTT broker.
 
@@ -395,139 +733,264 @@ class CloudSyncService:
         - All ESP32 sensor data: temperature, humidity, light, light_raw,
           soil, soil_raw, air_quality, air_raw, node_id, location
         - Edge metadata: edge_id, edge_name, edge_location, received_at
+
+        payload may be a dict or an already-serialised JSON object (bytes).
+        Telemetry goes out at QoS 0 (the next sample follows within seconds);
+        alarms pass qos=1 to get at-least-once delivery.
         """
         if not self.cloud_connected:
             # Queue for later
-            self.offline_queue.enqueue({'topic': topic, 'payload': payload})
-            self.stats['readings_queued'] += 1
-            logger.warning("Cloud offline - queued reading")
+            self._queue_offline(topic, payload)
+            logger.debug("Cloud offline - queued reading")
             return False
 
         try:
             # Send ENTIRE payload as JSON (all sensor fields included)
-            result = self.cloud_client.publish(
-                topic,
-                json.dumps(payload),  # Serializes ALL fields in payload
-                qos=1  # At least once delivery
-            )
+            data = payload if isinstance(payload, bytes) else _dumps(payload)
+            if qos == 0 and topic == self.config.CLOUD_TOPIC:
+                rc = self._fast_publish(data)
+            else:
+                rc = self.cloud_client.publish(topic, data, qos=qos).rc
             
-            if result.rc == mqtt.MQTT_ERR_SUCCESS:
+            if rc == mqtt.MQTT_ERR_SUCCESS:
                 self.stats['readings_sent'] += 1
-                self.stats['last_sync'] = datetime.now().isoformat()
+                self.stats['last_sync'] = self._now_iso()
                 return True
             else:
                 # Queue for retry
-                self.offline_queue.enqueue({'topic': topic, 'payload': payload})
-                self.stats['readings_queued'] += 1
+                self._queue_offline(topic, payload)
                 return False
                 
         except Exception as e:
             logger.error(f"Error sending to cloud: {e}")
-            self.offline_queue.enqueue({'topic': topic, 'payload': payload})
-            self.stats['readings_queued'] += 1
+            self._queue_offline(topic, payload)
             return False
     
-    def _batch_sender_loop(self):
-        """Periodically send batched readings to cloud"""
-        while self.running:
-            time.sleep(1)
+    def _fast_publish(self, data: bytes) -> int:
+        """
+        Queue a QoS 0 PUBLISH to CLOUD_TOPIC from the precompiled packet tail.
+
+        Skips paho's generic publish() path (topic validation, message info
+        objects, per-call header encoding). The packet goes through paho's own
+        outgoing queue, so ordering with other packets and locking are unchanged.
+        """
+        client = self.cloud_client
+        if client._sock is None:
+            return mqtt.MQTT_ERR_NO_CONN
+        
+        # Fixed header: PUBLISH, QoS 0, then the variable-length remaining size
+        length = len(self._publish_tail) + len(data)
+        header = bytearray(b'\x30')
+        while True:
+            byte = length & 0x7F
+            length >>= 7
+            if length:
+                header.append(byte | 0x80)
+            else:
+                header.append(byte)
+                break
+        
+        header += self._publish_tail
+        header += data
+        return client._packet_queue(mqtt.PUBLISH, header, 0, 0, self._publish_info)
+    
+    def _queue_offline(self, topic: str, payload):
+        """Hand a reading to the SQLite writer thread; never blocks on disk"""
+        item = {'topic': topic, 'payload': payload}
+        try:
+            self._db_queue.put_nowait(item)
+            self._db_overflow = False
+        except Full:
+            # The writer fell behind (slow or full disk): drop the oldest reading
+            # (warn once per overflow)
+            try:
+                self._db_queue.get_nowait()
+                self.stats['readings_dropped'] += 1
+            except Empty:
+                pass
+            if not self._db_overflow:
+                self._db_overflow = True
+                logger.warning(f"Offline write queue over {self.config.MAX_DB_QUEUE} readings - "
+                               f"dropping oldest")
+            try:
+                self._db_queue.put_nowait(item)
+            except Full:
+                self.stats['readings_dropped'] += 1
+                return
+        self.stats['readings_queued'] += 1
+    
+    def _db_writer_loop(self):
+        """Write queued offline readings to SQLite, one transaction per drain"""
+        db_queue = self._db_queue
+        stopping = False
+        
+        while not stopping:
+            item = db_queue.get()
+            if item is None:
+                break
             
-            should_send = False
+            items = [item]
+            while len(items) < self.config.OFFLINE_WRITE_BATCH:
+                try:
+                    item = db_queue.get_nowait()
+                except Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                items.append(item)
+            
+            # A bad item is logged and skipped; it must never stop the writer thread
+            batch = []
+            for item in items:
+                try:
+                    if isinstance(item['payload'], bytes):
+                        item['payload'] = _loads(item['payload'])
+                    batch.append(item)
+                except Exception as e:
+                    logger.error(f"Dropping unreadable offline reading: {e}")
             
-            with self.batch_lock:
-                # Send if batch is full
-                if len(self.batch_buffer) >= self.config.BATCH_SIZE:
-                    should_send = True
-                # Or if timeout reached and buffer not empty
-                elif len(self.batch_buffer) > 0:
-                    if time.time() - self.last_batch_time >= self.config.BATCH_TIMEOUT:
-                        should_send = True
+            try:
+                self.offline_queue.enqueue_many(batch)
+            except Exception as e:
+                logger.error(f"Error writing {len(batch)} readings to offline queue: {e}")
+    
+    def _housekeeping_loop(self):
+        """
+        Run batching, offline queue draining and stats reporting on one thread.
+
+        Each job runs when its interval is due, so the service needs no extra
+        sleeping threads beside the MQTT network loops. Between jobs the thread
+        sleeps until the earliest deadline; _buffer_reading and stop() wake it early.
+        """
+        next_drain = time.time() + self.config.RETRY_INTERVAL
+        next_stats = time.time() + self.config.STATS_INTERVAL
+        wake = self._batch_event
+        
+        while not self._stop_event.is_set():
+            # Cleared before the checks below, so a reading buffered after them
+            # still ends the wait
+            wake.clear()
+            now = time.time()
             
-            if should_send:
+            # Send if batch is full, or if timeout reached and buffer not empty
+            if self.batch_buffer and (
+                len(self.batch_buffer) >= self.config.BATCH_SIZE or
+                now - self.last_batch_time >= self.config.BATCH_TIMEOUT
+            ):
                 self._send_batch()
+            
+            if now >= next_drain:
+                next_drain = now + self.config.RETRY_INTERVAL
+                self._drain_offline_queue()
+            
+            if now >= next_stats:
+                next_stats = now + self.config.STATS_INTERVAL
+                self._report_stats()
+            
+            deadline = min(next_drain, next_stats)
+            if self.batch_buffer:
+                deadline = min(deadline, self.last_batch_time + self.config.BATCH_TIMEOUT)
+            wake.wait(max(0.0, deadline - time.time()))
     
     def _send_batch(self):
         """Send current batch to cloud"""
-        with self.batch_lock:
-            if not self.batch_buffer:
-                return
-            
-            batch = self.batch_buffer.copy()
-            self.batch_buffer.clear()
-            self.last_batch_time = time.time()
-        
-        # Create batch payload
-        batch_payload = {
-            'edge_id': self.config.EDGE_ID,
-            'edge_name': self.config.EDGE_NAME,
-            'batch_size': len(batch),
-            'batch_time': datetime.now().isoformat(),
-            'readings': batch
-        }
+        if not self.batch_buffer:
+            return
         
-        success = self._send_to_cloud(self.config.CLOUD_TOPIC, batch_payload)
+        # Swap buffers instead of copying. A reading appended to the old list after
+        # the swap stays there and goes out once the lists swap back
+        batch = self.batch_buffer
+        self.batch_buffer = self._buf_b if batch is self._buf_a else self._buf_a
+        self.last_batch_time = time.time()
+        count = len(batch)
         
-        if success:
-            logger.info(f"Sent batch of {len(batch)} readings to cloud")
+        # Drop the oldest readings if the sender fell far behind (warn once per overflow)
+        start = max(0, count - self.config.MAX_BATCH_BUFFER)
+        if start:
+            self.stats['readings_dropped'] += start
+            if not self._batch_overflow:
+                self._batch_overflow = True
+                logger.warning(f"Batch buffer over {self.config.MAX_BATCH_BUFFER} readings - "
+                               f"dropping oldest")
         else:
-            logger.warning(f"Failed to send batch - queued {len(batch)} readings")
+            self._batch_overflow = False
+        
+        # One publish per reading, back-to-back: the cloud server stores each
+        # message as a row, and paho writes the queued packets out together
+        send = self._send_to_cloud
+        topic = self.config.CLOUD_TOPIC
+        sent = 0
+        for i in range(start, count):
+            if send(topic, batch[i]):
+                sent += 1
+        del batch[:count]
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Sent {sent}/{count - start} buffered readings to cloud")
     
-    def _offline_queue_processor(self):
-        """Process offline queue when cloud becomes available"""
-        while self.running:
-            time.sleep(self.config.RETRY_INTERVAL)
-            
-            if not self.cloud_connected:
-                continue
-            
-            pending = self.offline_queue.get_pending(limit=50)
-            
-            if not pending:
-                continue
-            
-            logger.info(f"Processing {len(pending)} queued readings...")
-            
-            sent_ids = []
-            for item in pending:
-                try:
-                    topic = item['data'].get('topic', self.config.CLOUD_TOPIC)
-                    payload = item['data'].get('payload', item['data'])
-                    
-                    result = self.cloud_client.publish(
-                        topic,
-                        json.dumps(payload),
-                        qos=1
-                    )
-                    
-                    if result.rc == mqtt.MQTT_ERR_SUCCESS:
-                        sent_ids.append(item['id'])
-                        self.stats['readings_sent'] += 1
-                    
-                except Exception as e:
-                    logger.error(f"Error processing queued item: {e}")
-                    break  # Stop on error, retry later
-            
-            if sent_ids:
-                self.offline_queue.mark_sent(sent_ids)
-                logger.info(f"Cleared {len(sent_ids)} readings from offline queue")
+    def _drain_offline_queue(self):
+        """Resend queued readings once the cloud is available"""
+        if not self.cloud_connected:
+            return
+        
+        queued = self.offline_queue.get_count()
+        if not queued:
+            return
+        
+        logger.info(f"Processing {min(queued, self.config.OFFLINE_DRAIN_LIMIT)} queued readings...")
+        
+        # Streamed in chunks; sent readings are deleted as each chunk completes
+        pending = self.offline_queue.get_pending(limit=self.config.OFFLINE_DRAIN_LIMIT,
+                                                 chunk_size=self.config.OFFLINE_MARK_BATCH)
+        
+        sent_ids = []
+        cleared = 0
+        for item in pending:
+            try:
+                topic = item['data'].get('topic', self.config.CLOUD_TOPIC)
+                payload = item['data'].get('payload', item['data'])
+                
+                result = self.cloud_client.publish(
+                    topic,
+                    _dumps(payload),
+                    qos=1
+                )
+                
+                if result.rc == mqtt.MQTT_ERR_SUCCESS:
+                    sent_ids.append(item['id'])
+                    self.stats['readings_sent'] += 1
+                
+                if len(sent_ids) >= self.config.OFFLINE_MARK_BATCH:
+                    self.offline_queue.mark_sent(sent_ids)
+                    cleared += len(sent_ids)
+                    sent_ids = []
+                
+            except Exception as e:
+                logger.error(f"Error processing queued item: {e}")
+                break  # Stop on error, retry later
+        
+        if sent_ids:
+            self.offline_queue.mark_sent(sent_ids)
+            cleared += len(sent_ids)
+        
+        if cleared:
+            logger.info(f"Cleared {cleared} readings from offline queue")
 
-    def _stats_reporter_loop(self):
-        """Periodically report statistics to confirm data is flowing"""
-        report_interval = 60  # Report every 60 seconds
-        while self.running:
-            time.sleep(report_interval)
-
-            if self.stats['readings_received'] > 0 or self.stats['readings_sent'] > 0:
-                queue_size = self.offline_queue.get_count()
-                logger.info(f"=== Data Flow Stats ===")
-                logger.info(f"  Received from ESP32: {self.stats['readings_received']}")
-                logger.info(f"  Sent to cloud: {self.stats['readings_sent']}")
-                logger.info(f"  Queued (offline): {self.stats['readings_queued']}")
-                logger.info(f"  Queue size: {queue_size}")
-                logger.info(f"  Cloud connected: {self.cloud_connected}")
-                if self.stats['readings_received'] > 0:
-                    success_rate = (self.stats['readings_sent'] / self.stats['readings_received']) * 100
-                    logger.info(f"  Success rate: {success_rate:.1f}%")
+    def _report_stats(self):
+        """Report statistics to confirm data is flowing"""
+        if self.stats['readings_received'] > 0 or self.stats['readings_sent'] > 0:
+            queue_size = self.offline_queue.get_count()
+            logger.info(f"=== Data Flow Stats ===")
+            logger.info(f"  Received from ESP32: {self.stats['readings_received']}")
+            logger.info(f"  Sent to cloud: {self.stats['readings_sent']}")
+            logger.info(f"  Queued (offline): {self.stats['readings_queued']}")
+            logger.info(f"  Dropped (overflow): {self.stats['readings_dropped']}")
+            logger.info(f"  Queue size: {queue_size}")
+            logger.info(f"  Cloud connected: {self.cloud_connected}")
+            if self.stats['readings_received'] > 0:
+                success_rate = (self.stats['readings_sent'] / self.stats['readings_received']) * 100
+                logger.info(f"  Success rate: {success_rate:.1f}%")
 
     def get_status(self) -> dict:
         """Get service status"""
@@ -542,7 +1005,6 @@ class CloudSyncService:
                 'edge_id': self.config.EDGE_ID,
                 'local_broker': f"{self.config.LOCAL_BROKER}:{self.config.LOCAL_PORT}",
                 'cloud_broker': f"{self.config.CLOUD_BROKER}:{self.config.CLOUD_PORT}",
-                'realtime_mode': self.config.REALTIME_MODE,
                 'batch_size': self.config.BATCH_SIZE,
                 'batch_timeout': self.config.BATCH_TIMEOUT
             }
@@ -557,12 +1019,12 @@ def main():
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Examples:
-  python cloud_sync.py                          # Start with default settings (real-time mode)
+  python cloud_sync.py                          # Start with default settings
   python cloud_sync.py --cloud-ip 51.107.8.227  # Specify cloud server IP
   python cloud_sync.py --edge-id greenhouse-01  # Set edge identifier
-  python cloud_sync.py --realtime               # Enable real-time sync (default)
-  python cloud_sync.py --no-realtime --batch-size 10 --batch-timeout 30  # Use batching
+  python cloud_sync.py --batch-size 100 --batch-timeout 0.5  # Larger, less frequent batches
   python cloud_sync.py --test                   # Test cloud connection
+  python cloud_sync.py --verbose                # Log every forwarded reading
         """
     )
     
@@ -580,17 +1042,19 @@ Examples:
                         help='Edge gateway name')
     parser.add_argument('--batch-size', type=int, default=Config.BATCH_SIZE,
                         help='Number of readings per batch')
-    parser.add_argument('--batch-timeout', type=int, default=Config.BATCH_TIMEOUT,
+    parser.add_argument('--batch-timeout', type=float, default=Config.BATCH_TIMEOUT,
                         help='Send batch after this many seconds')
-    parser.add_argument('--realtime', action='store_true', default=Config.REALTIME_MODE,
-                        help='Enable real-time mode (send data immediately)')
-    parser.add_argument('--no-realtime', dest='realtime', action='store_false',
-                        help='Disable real-time mode (use batching)')
     parser.add_argument('--test', action='store_true',
                         help='Test cloud connection and exit')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help='Enable debug logging (per-reading detail)')
 
     args = parser.parse_args()
 
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+        logger.setLevel(logging.DEBUG)
+
     # Update config
     Config.CLOUD_BROKER = args.cloud_ip
     Config.CLOUD_PORT = args.cloud_port
@@ -600,7 +1064,6 @@ Examples:
     Config.EDGE_NAME = args.edge_name
     Config.BATCH_SIZE = args.batch_size
     Config.BATCH_TIMEOUT = args.batch_timeout
-    Config.REALTIME_MODE = args.realtime
     
     if args.test:
         # Test cloud connection
@@ -638,7 +1101,7 @@ Examples:
                 
                 result = test_client.publish(
                     Config.CLOUD_TOPIC,
-                    json.dumps(payload),
+                    _dumps(payload),
                     qos=1
                 )
                 
@@ -666,7 +1129,7 @@ Examples:
     print(f"  Edge Name:    {Config.EDGE_NAME}")
     print(f"  Local MQTT:   {Config.LOCAL_BROKER}:{Config.LOCAL_PORT}")
     print(f"  Cloud MQTT:   {Config.CLOUD_BROKER}:{Config.CLOUD_PORT}")
-    print(f"  Sync Mode:    {'REAL-TIME (immediate)' if Config.REALTIME_MODE else f'BATCH (size: {Config.BATCH_SIZE}, timeout: {Config.BATCH_TIMEOUT}s)'}")
+    print(f"  Sync Mode:    MICRO-BATCH (size: {Config.BATCH_SIZE}, timeout: {Config.BATCH_TIMEOUT}s)")
     print("=" * 60)
     print("  Press Ctrl+C to stop")
     print("=" * 60)